@@ -8,10 +8,12 @@ Features:
 
 Setup:
 1. Install dependencies:
-   pip install streamlit playwright pillow requests openai beautifulsoup4 gspread google-auth notion-client
+   pip install streamlit playwright pillow numpy requests openai selectolax gspread google-auth notion-client
    playwright install
 2. Set your OpenAI API key:
    export OPENAI_API_KEY=sk-...
+   Or run heuristics on a local quantized model instead (pip install llama-cpp-python):
+   export HEURISTICS_BACKEND=local HEURISTICS_MODEL_PATH=/path/to/model.gguf
 3. For Google Sheets export:
    - Create a Google Service Account, download the JSON credentials
    - Share your Google Sheet with the service account email
@@ -26,18 +28,33 @@ import sys
 import json
 import os
 import re
+import hashlib
+import atexit
+import asyncio
+import queue
+import threading
+import time
 import requests
+import numpy as np
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
 from io import BytesIO
-from PIL import Image, ImageDraw
-from playwright.sync_api import sync_playwright
-import openai
+from PIL import Image
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from openai import OpenAI
 import streamlit as st
 import tempfile
 import gspread
 from google.oauth2.service_account import Credentials
-from notion_client import Client as NotionClient
+from notion_client import AsyncClient as AsyncNotionClient
+from notion_client import APIErrorCode, APIResponseError
 
 WCAG_CONTRAST_RATIO = 4.5
+# Findings reported per check; the rest collapse into one "truncated" result
+MAX_IMG_ISSUES = 100
+MAX_CONTRAST_ISSUES = 100
+CONTRAST_BATCH_SIZE = 500  # body elements scanned per page.evaluate
 NIELSEN_HEURISTICS = [
     "Visibility of system status",
     "Match between system and the real world",
@@ -50,69 +67,215 @@ NIELSEN_HEURISTICS = [
     "Help users recognize, diagnose, and recover from errors",
     "Help and documentation"
 ]
+_NUM_RE = re.compile(r'[\d.]+')
+# Long url(data:...) payloads inside a style attribute value
+_STYLE_DATA_URI_RE = re.compile(r'url\(\s*([\'"]?)data:[^)\'"]{50,}\1\s*\)')
+
+NETWORK_IDLE_TIMEOUT = 5000  # ms
+SCREENSHOT_QUALITY = 85
+# Annotated screenshots larger than this are downscaled to bound memory
+ANNOTATION_MAX_SIZE = (2000, 20000)
+
+# "openai" (default) or "local" for a quantized GGUF model via llama.cpp
+HEURISTICS_BACKEND = os.getenv("HEURISTICS_BACKEND", "openai")
+HEURISTICS_MODEL = "gpt-4o-mini"
+HEURISTICS_LOCAL_MODEL_PATH = os.getenv("HEURISTICS_MODEL_PATH")
+HEURISTICS_CACHE_SIZE = 256
+PROGRESS_INTERVAL = 0.1
+# Parsed heuristics keyed by sha256(backend, model, url, HTML sent), most recent last
+_heuristics_cache = OrderedDict()
+_heuristics_cache_lock = threading.Lock()
+
+# Collects everything the checks need in one round-trip instead of several
+# per element. bbox is null for elements without a layout box, matching
+# ElementHandle.bounding_box(). Only the first maxImgs images are measured,
+# and only text in the [start, start+count) slice of body elements, so the
+# caller can stop scanning once it has enough contrast failures.
+# Text colors are the computed ones flattened to what is actually painted:
+# semi-transparent backgrounds are composited over their ancestors (down to
+# the first opaque one, or white), and the text color over that result.
+_EXTRACT_JS = """([maxImgs, start, count]) => {
+    const box = (el) => {
+        if (!el.getClientRects().length) return null;
+        const r = el.getBoundingClientRect();
+        return {x: r.x, y: r.y, width: r.width, height: r.height};
+    };
+    const hasText = (el) => [...el.childNodes].some(
+        (n) => n.nodeType === Node.TEXT_NODE && n.textContent.trim());
+    const rgba = (value) => {
+        if (!value || !value.startsWith('rgb')) return null;
+        const m = value.match(/[\\d.]+/g) || [];
+        return m.length >= 3 ? [+m[0], +m[1], +m[2], m.length > 3 ? +m[3] : 1] : null;
+    };
+    const over = (top, under) => [0, 1, 2].map((i) => top[i] * top[3] + under[i] * (1 - top[3])).concat(1);
+    const css = (c) => `rgb(${c.slice(0, 3).map(Math.round).join(', ')})`;
+    const background = (el) => {
+        const layers = [];
+        for (let n = el; n; n = n.parentElement) {
+            const c = rgba(getComputedStyle(n).backgroundColor);
+            if (c && c[3] > 0) {
+                layers.push(c);
+                if (c[3] >= 1) break;
+            }
+        }
+        return layers.reduceRight((under, top) => over(top, under), [255, 255, 255, 1]);
+    };
+    const textColors = (el) => {
+        const bg = background(el);
+        const fg = rgba(getComputedStyle(el).color);
+        return {color: fg ? css(over(fg, bg)) : getComputedStyle(el).color, bg: css(bg)};
+    };
+    const imgs = !maxImgs ? [] : [...document.querySelectorAll('img')]
+        .filter((img) => !img.alt || !img.alt.trim())
+        .slice(0, maxImgs)
+        .map(box);
+    // Snapshot the (static) element list once so later batches neither
+    // re-query the DOM nor shift when the page adds or removes nodes
+    if (start === 0) window.__wcagAuditElements = document.querySelectorAll('body *');
+    const elements = window.__wcagAuditElements;
+    const done = start + count >= elements.length;
+    const text = Array.prototype.slice.call(elements, start, start + count)
+        .filter((el) => !['SCRIPT', 'STYLE', 'NOSCRIPT'].includes(el.tagName) && hasText(el))
+        .filter((el) => getComputedStyle(el).visibility !== 'hidden')
+        .map((el) => ({...textColors(el), bbox: box(el), id: el.getAttribute('id'), class: el.getAttribute('class')}));
+    if (done) delete window.__wcagAuditElements;
+    return {imgs, text, done};
+}"""
+
+# Playwright's sync API is tied to the thread that started it, and Streamlit
+# runs each script rerun on its own thread, so a pool of BROWSER_WORKERS
+# threads each owns a warm Chromium instance and audits are queued to them.
+BROWSER_WORKERS = 3
+# Upper bound on one audit, including time spent queued behind others
+BROWSER_JOB_TIMEOUT = 180  # seconds
+_browser_jobs = queue.Queue()
+_browser_threads = []
+_browser_threads_lock = threading.Lock()
+
+def _browser_worker():
+    playwright = browser = None
+    try:
+        while True:
+            job = _browser_jobs.get()
+            if job is None:
+                break
+            fn, args, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if playwright is None:
+                    playwright = sync_playwright().start()
+                if browser is None or not browser.is_connected():
+                    browser = playwright.chromium.launch()
+                future.set_result(fn(browser, *args))
+            except Exception as e:
+                future.set_exception(e)
+    finally:
+        if browser is not None:
+            browser.close()
+        if playwright is not None:
+            playwright.stop()
+
+def _stop_browser():
+    with _browser_threads_lock:
+        alive = [t for t in _browser_threads if t.is_alive()]
+    for _ in alive:
+        _browser_jobs.put(None)
+    for t in alive:
+        t.join(timeout=10)
+
+def _run_in_browser(fn, *args):
+    with _browser_threads_lock:
+        _browser_threads[:] = [t for t in _browser_threads if t.is_alive()]
+        while len(_browser_threads) < BROWSER_WORKERS:
+            t = threading.Thread(target=_browser_worker, name=f"playwright-{len(_browser_threads)}", daemon=True)
+            t.start()
+            _browser_threads.append(t)
+    future = Future()
+    _browser_jobs.put((fn, args, future))
+    try:
+        return future.result(timeout=BROWSER_JOB_TIMEOUT)
+    except FuturesTimeoutError:
+        future.cancel()
+        raise TimeoutError(f"Browser audit did not finish within {BROWSER_JOB_TIMEOUT}s")
+
+atexit.register(_stop_browser)
 
 def get_html_and_screenshot(url):
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
+    return _run_in_browser(_capture_page, url)
+
+def _contrast_failures(elements):
+    candidates = []
+    for el in elements:
+        if not el["bbox"]:
+            continue
+        color, bg = el["color"], el["bg"]
+        rgb_color = parse_color(color)
+        rgb_bg = parse_color(bg) or (255,255,255)
+        if rgb_color and len(rgb_color) == 3 and len(rgb_bg) == 3:
+            candidates.append((el, color, bg, rgb_color, rgb_bg))
+    if not candidates:
+        return []
+    ratios = contrast_ratios([c[3] for c in candidates], [c[4] for c in candidates])
+    failures = []
+    for idx in np.flatnonzero(ratios < WCAG_CONTRAST_RATIO):
+        el, color, bg, _, _ = candidates[idx]
+        failures.append((el["bbox"], color, bg, float(ratios[idx]), el["id"], el["class"]))
+    return failures
+
+def _capture_page(browser, url):
+    context = browser.new_context()
+    try:
+        page = context.new_page()
         page.goto(url, timeout=60000, wait_until="load")
-        page.wait_for_timeout(3000)  # Add this after page.goto(...)
+        # Give SPAs a bounded chance to settle; pages that keep polling never go idle
+        try:
+            page.wait_for_load_state("networkidle", timeout=NETWORK_IDLE_TIMEOUT)
+        except PlaywrightTimeoutError:
+            pass
+        # Web fonts change text rendering, so let them settle before the scan
+        page.evaluate("document.fonts.ready.then(() => true)")
         html = page.content()
-        screenshot = page.screenshot(full_page=True)
-        # Get positions of images missing alt text
-        img_positions = []
-        for img in page.query_selector_all("img"):
-            alt = img.get_attribute("alt")
-            if not alt or not alt.strip():
-                bbox = img.bounding_box()
-                if bbox:
-                    img_positions.append(bbox)
-        # Get positions of elements with bad color contrast (inline styles only)
-        contrast_positions = []
-        for el in page.query_selector_all("*[style]"):
-            style = el.get_attribute("style")
-            color, bg = extract_inline_styles(style)
-            rgb_color = parse_color(color)
-            rgb_bg = parse_color(bg) or (255,255,255)
-            if rgb_color and rgb_bg:
-                ratio = contrast_ratio(rgb_color, rgb_bg)
-                if ratio < WCAG_CONTRAST_RATIO:
-                    bbox = el.bounding_box()
-                    if bbox:
-                        contrast_positions.append((bbox, color, bg, ratio))
-        browser.close()
+        screenshot = page.screenshot(full_page=True, type="jpeg", quality=SCREENSHOT_QUALITY)
+        data = page.evaluate(_EXTRACT_JS, [MAX_IMG_ISSUES, 0, CONTRAST_BATCH_SIZE])
+        # Positions of images missing alt text, in document order
+        img_positions = data["imgs"]
+        # Positions of text with bad color contrast (computed styles), scanned
+        # in batches until one more failure than can be reported is found
+        contrast_positions = _contrast_failures(data["text"])
+        start = 0
+        while not data["done"] and len(contrast_positions) <= MAX_CONTRAST_ISSUES:
+            start += CONTRAST_BATCH_SIZE
+            data = page.evaluate(_EXTRACT_JS, [0, start, CONTRAST_BATCH_SIZE])
+            contrast_positions += _contrast_failures(data["text"])
+        contrast_positions = contrast_positions[:MAX_CONTRAST_ISSUES + 1]
+    finally:
+        context.close()
     return html, screenshot, img_positions, contrast_positions
 
 def hex_to_rgb(value):
-    value = value.lstrip('#')
-    lv = len(value)
-    return tuple(int(value[i:i+lv//3], 16) for i in range(0, lv, lv//3))
-
-def luminance(rgb):
-    def channel(c):
-        c = c/255.0
-        return c/12.92 if c <= 0.03928 else ((c+0.055)/1.055)**2.4
-    r, g, b = rgb
-    return 0.2126*channel(r) + 0.7152*channel(g) + 0.0722*channel(b)
-
-def contrast_ratio(rgb1, rgb2):
-    l1 = luminance(rgb1)
-    l2 = luminance(rgb2)
-    lighter = max(l1, l2)
-    darker = min(l1, l2)
-    return (lighter + 0.05) / (darker + 0.05)
-
-def extract_inline_styles(style):
-    color = bg = None
-    if style:
-        color_match = re.search(r'color:\s*([^;]+);?', style)
-        bg_match = re.search(r'background(?:-color)?:\s*([^;]+);?', style)
-        if color_match:
-            color = color_match.group(1)
-        if bg_match:
-            bg = bg_match.group(1)
-    return color, bg
+    h = value.lstrip('#')
+    if len(h) == 6:
+        v = int(h, 16)
+        return (v >> 16) & 0xFF, (v >> 8) & 0xFF, v & 0xFF
+    if len(h) == 3:
+        r, g, b = h
+        return int(r*2, 16), int(g*2, 16), int(b*2, 16)
+    return None
+
+_LUMINANCE_WEIGHTS = np.array([0.2126, 0.7152, 0.0722], dtype=np.float64)
+
+def luminances(rgbs):
+    c = np.asarray(rgbs, dtype=np.float64).reshape(-1, 3) / 255.0
+    c = np.where(c <= 0.03928, c/12.92, ((c+0.055)/1.055)**2.4)
+    return c @ _LUMINANCE_WEIGHTS
+
+def contrast_ratios(fg_rgbs, bg_rgbs):
+    l_fg = luminances(fg_rgbs)
+    l_bg = luminances(bg_rgbs)
+    return (np.maximum(l_fg, l_bg) + 0.05) / (np.minimum(l_fg, l_bg) + 0.05)
 
+@lru_cache(maxsize=4096)
 def parse_color(val):
     if not val:
         return None
@@ -120,27 +283,40 @@ def parse_color(val):
     if val.startswith('#'):
         return hex_to_rgb(val)
     elif val.startswith('rgb'):
-        nums = [int(float(x)) for x in re.findall(r'[\d.]+', val)]
+        nums = [int(float(x)) for x in _NUM_RE.findall(val)]
         return tuple(nums[:3])
     return None
 
+def _truncated_result(rule, severity, detail):
+    return {
+        "type": "WCAG",
+        "rule": f"{rule} (truncated: {detail})",
+        "severity": severity,
+        "element": "",
+        "suggestion": "Further elements fail this check; fix the listed ones and re-run the audit.",
+        "bbox": None
+    }
+
 def wcag_checks(html, url, img_positions, contrast_positions):
-    from bs4 import BeautifulSoup
-    soup = BeautifulSoup(html, 'html.parser')
+    from selectolax.lexbor import LexborHTMLParser
+    tree = LexborHTMLParser(html)
     results = []
     # 1. Missing alt text
     img_idx = 0
-    for img in soup.find_all('img'):
-        alt = img.get('alt')
+    for img in tree.css('img'):
+        alt = img.attributes.get('alt')
         if not alt or not alt.strip():
+            if img_idx >= MAX_IMG_ISSUES:
+                img_idx += 1
+                continue
             bbox = img_positions[img_idx] if img_idx < len(img_positions) else None
-            el_id = img.get('id')
-            el_class = img.get('class')
-            el_info = str(img)[:100]
+            el_id = img.attributes.get('id')
+            el_class = img.attributes.get('class')
+            el_info = img.html[:100]
             if el_id:
                 el_info += f" | id={el_id}"
             if el_class:
-                el_info += f" | class={' '.join(el_class) if isinstance(el_class, list) else el_class}"
+                el_info += f" | class={el_class}"
             results.append({
                 "type": "WCAG",
                 "rule": "Images must have alt text",
@@ -150,22 +326,16 @@ def wcag_checks(html, url, img_positions, contrast_positions):
                 "bbox": bbox
             })
             img_idx += 1
-    # 2. Color contrast (inline styles only)
-    for i, (bbox, color, bg, ratio) in enumerate(contrast_positions):
-        # Try to find the matching element in soup for id/class
-        el = None
-        for candidate in soup.find_all(style=True):
-            style = candidate.get('style')
-            if style and color in style and (not bg or bg in style):
-                el = candidate
-                break
-        el_id = el.get('id') if el else None
-        el_class = el.get('class') if el else None
+    if img_idx > MAX_IMG_ISSUES:
+        results.append(_truncated_result("Images must have alt text", 3,
+                                         f"{img_idx - MAX_IMG_ISSUES} more not shown"))
+    # 2. Color contrast (computed styles)
+    for bbox, color, bg, ratio, el_id, el_class in contrast_positions[:MAX_CONTRAST_ISSUES]:
         el_info = f"color: {color}, background: {bg}"
         if el_id:
             el_info += f" | id={el_id}"
         if el_class:
-            el_info += f" | class={' '.join(el_class) if isinstance(el_class, list) else el_class}"
+            el_info += f" | class={el_class}"
         results.append({
             "type": "WCAG",
             "rule": "Text must have sufficient color contrast",
@@ -174,10 +344,99 @@ def wcag_checks(html, url, img_positions, contrast_positions):
             "suggestion": f"Increase contrast between text color {color} and background {bg} (ratio: {ratio:.2f}).",
             "bbox": bbox
         })
+    if len(contrast_positions) > MAX_CONTRAST_ISSUES:
+        # Scanning stops at the first failure past the cap, so the rest is uncounted
+        results.append(_truncated_result("Text must have sufficient color contrast", 2,
+                                         f"more than {MAX_CONTRAST_ISSUES} found, rest not shown"))
     return results
 
-def gpt4_heuristics_analysis(html, url):
-    openai.api_key = os.getenv("OPENAI_API_KEY")
+_openai_client = None
+_local_llm = None
+# llama_cpp.Llama is not thread-safe; serializes loading and generation
+_local_llm_lock = threading.RLock()
+
+def _get_openai_client():
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _openai_client
+
+def _get_local_llm():
+    global _local_llm
+    with _local_llm_lock:
+        if _local_llm is None:
+            from llama_cpp import Llama
+            _local_llm = Llama(model_path=HEURISTICS_LOCAL_MODEL_PATH, n_ctx=8192, verbose=False)
+        return _local_llm
+
+_HEURISTICS_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "type": {"type": "string"},
+            "rule": {"type": "string"},
+            "severity": {"type": "integer"},
+            "element": {"type": "string"},
+            "suggestion": {"type": "string"}
+        },
+        "required": ["type", "rule", "severity", "suggestion"]
+    }
+}
+
+def _stream_heuristics(prompt):
+    messages = [{"role": "user", "content": prompt}]
+    if HEURISTICS_BACKEND == "local":
+        with _local_llm_lock:
+            stream = _get_local_llm().create_chat_completion(
+                messages=messages,
+                max_tokens=1200,
+                temperature=0.2,
+                response_format={"type": "json_object", "schema": _HEURISTICS_SCHEMA},
+                stream=True
+            )
+            for chunk in stream:
+                yield chunk["choices"][0]["delta"].get("content")
+    else:
+        stream = _get_openai_client().chat.completions.create(
+            model=HEURISTICS_MODEL,
+            messages=messages,
+            max_tokens=1200,
+            temperature=0.2,
+            stream=True
+        )
+        for chunk in stream:
+            yield chunk.choices[0].delta.content if chunk.choices else None
+
+def _prompt_html(html):
+    # Drop markup that carries no UX signal so the 8000-char budget goes to content
+    from selectolax.lexbor import LexborHTMLParser
+    tree = LexborHTMLParser(html)
+    for node in tree.css('script, style, noscript, svg, iframe'):
+        node.decompose()
+    for node in tree.css('[src], [href], [srcset]'):
+        for attr in ('src', 'href', 'srcset'):
+            value = node.attrs.get(attr)
+            if value and value.startswith('data:') and len(value) > 50:
+                node.attrs[attr] = 'data:...'
+    for node in tree.css('[style]'):
+        style = node.attrs.get('style')
+        if style and 'data:' in style:
+            node.attrs['style'] = _STYLE_DATA_URI_RE.sub('url(data:...)', style)
+    return tree.html or ""
+
+def gpt4_heuristics_analysis(html, url, on_text=None, refresh=False):
+    snippet = _prompt_html(html)[:8000]
+    model = HEURISTICS_LOCAL_MODEL_PATH if HEURISTICS_BACKEND == "local" else HEURISTICS_MODEL
+    cache_key = hashlib.sha256(f"{HEURISTICS_BACKEND}\n{model}\n{url}\n{snippet}".encode()).hexdigest()
+    cached = None
+    if not refresh:
+        with _heuristics_cache_lock:
+            cached = _heuristics_cache.get(cache_key)
+            if cached is not None:
+                _heuristics_cache.move_to_end(cache_key)
+    if cached is not None:
+        return [dict(r) if isinstance(r, dict) else r for r in cached]
     prompt = f"""You are an expert UX auditor. Given the following HTML from {url}, analyze it for each of Nielsen's 10 usability heuristics. For each heuristic, provide:
 - 1-2 observations (if any issues found)
 - A suggestion for improvement (or say 'No issues found' if none)
@@ -186,41 +445,74 @@ Output as a JSON list of 10 objects (one per heuristic), each with: type (\"Heur
 Always output a list of 10 objects, even if no issues are found.
 
 HTML:
-{html[:8000]}"""
-    response = openai.ChatCompletion.create(
-    model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=1200,
-        temperature=0.2
-    )
+{snippet}"""
+    # on_text gets the accumulated response so callers can show progress,
+    # at most every PROGRESS_INTERVAL seconds plus once at the end
+    text = ""
+    last_update = time.monotonic()
+    for delta in _stream_heuristics(prompt):
+        if delta:
+            text += delta
+            if on_text and time.monotonic() - last_update >= PROGRESS_INTERVAL:
+                on_text(text)
+                last_update = time.monotonic()
+    if on_text and text:
+        on_text(text)
     try:
-        text = response['choices'][0]['message']['content']
         start = text.find('[')
         end = text.rfind(']')
         if start != -1 and end != -1:
-            return json.loads(text[start:end+1])
+            heuristics = json.loads(text[start:end+1])
         else:
             return []
     except Exception as e:
         print("GPT-4 error:", e)
         return []
+    with _heuristics_cache_lock:
+        _heuristics_cache[cache_key] = heuristics
+        _heuristics_cache.move_to_end(cache_key)
+        if len(_heuristics_cache) > HEURISTICS_CACHE_SIZE:
+            _heuristics_cache.popitem(last=False)
+    return [dict(r) if isinstance(r, dict) else r for r in heuristics]
 
-def run_audit(url):
+def run_audit(url, on_text=None, refresh=False):
     html, screenshot, img_positions, contrast_positions = get_html_and_screenshot(url)
     wcag = wcag_checks(html, url, img_positions, contrast_positions)
-    heuristics = gpt4_heuristics_analysis(html, url)
+    heuristics = gpt4_heuristics_analysis(html, url, on_text, refresh)
     results = wcag + heuristics
     return results, screenshot
 
 def annotate_screenshot(screenshot_bytes, results):
-    img = Image.open(BytesIO(screenshot_bytes)).convert("RGBA")
-    draw = ImageDraw.Draw(img)
-    for r in results:
-        bbox = r.get("bbox")
-        if bbox:
-            x, y, w, h = bbox["x"], bbox["y"], bbox["width"], bbox["height"]
-            draw.rectangle([x, y, x+w, y+h], outline="red", width=4)
-    return img
+    img = Image.open(BytesIO(screenshot_bytes))
+    full_width = img.width
+    # JPEG can decode straight to a reduced size without the full-res buffer
+    img.draft("RGB", ANNOTATION_MAX_SIZE)
+    img = img.convert("RGB")
+    img.thumbnail(ANNOTATION_MAX_SIZE, Image.BILINEAR)
+    scale = img.width / full_width
+    bboxes = [r["bbox"] for r in results if r.get("bbox")]
+    if not bboxes:
+        return img
+    # Paint 4px red borders straight into the pixel buffer
+    arr = np.array(img)
+    height, width = arr.shape[:2]
+    boxes = np.array([[b["x"], b["y"], b["x"]+b["width"], b["y"]+b["height"]] for b in bboxes]) * scale
+    boxes = np.rint(boxes).astype(int)
+    boxes[:, 2:] += 1
+    red = (255, 0, 0)
+
+    def paint(r0, r1, c0, c1):
+        # Clip only the band being painted, so edges outside the image are skipped
+        r0, r1 = np.clip((r0, r1), 0, height)
+        c0, c1 = np.clip((c0, c1), 0, width)
+        arr[r0:r1, c0:c1] = red
+
+    for x0, y0, x1, y1 in boxes:
+        paint(y0, min(y0+4, y1), x0, x1)
+        paint(max(y1-4, y0), y1, x0, x1)
+        paint(y0, y1, x0, min(x0+4, x1))
+        paint(y0, y1, max(x1-4, x0), x1)
+    return Image.fromarray(arr)
 
 def export_to_google_sheets(results, sheet_url, creds_json_path):
     scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
@@ -229,26 +521,48 @@ def export_to_google_sheets(results, sheet_url, creds_json_path):
     sh = gc.open_by_url(sheet_url)
     worksheet = sh.add_worksheet(title="Audit Results", rows=str(len(results)+1), cols="10")
     headers = ["type", "rule", "severity", "element", "suggestion"]
-    worksheet.append_row(headers)
-    for r in results:
-        worksheet.append_row([r.get("type"), r.get("rule"), r.get("severity"), r.get("element"), r.get("suggestion")])
-    return True
-
-def export_to_notion(results, notion_token, database_id):
-    notion = NotionClient(auth=notion_token)
-    for r in results:
-        notion.pages.create(
-            parent={"database_id": database_id},
-            properties={
-                "Type": {"title": [{"text": {"content": r.get("type", "")}}]},
-                "Rule": {"rich_text": [{"text": {"content": r.get("rule", "")}}]},
-                "Severity": {"number": r.get("severity", 1)},
-                "Element": {"rich_text": [{"text": {"content": r.get("element", "")}}]},
-                "Suggestion": {"rich_text": [{"text": {"content": r.get("suggestion", "")}}]}
-            }
-        )
+    rows = [headers] + [[r.get("type"), r.get("rule"), r.get("severity"), r.get("element"), r.get("suggestion")] for r in results]
+    worksheet.append_rows(rows, value_input_option="RAW")
     return True
 
+# Notion averages ~3 requests/second per integration: each of the
+# NOTION_CONCURRENCY slots is held for at least a second, and rate-limited
+# requests are retried after the server's Retry-After delay.
+NOTION_CONCURRENCY = 3
+NOTION_MAX_RETRIES = 5
 
+async def _push_to_notion(r, notion, database_id, sem):
+    loop = asyncio.get_running_loop()
+    async with sem:
+        started = loop.time()
+        for attempt in range(NOTION_MAX_RETRIES + 1):
+            try:
+                await notion.pages.create(
+                    parent={"database_id": database_id},
+                    properties={
+                        "Type": {"title": [{"text": {"content": r.get("type", "")}}]},
+                        "Rule": {"rich_text": [{"text": {"content": r.get("rule", "")}}]},
+                        "Severity": {"number": r.get("severity", 1)},
+                        "Element": {"rich_text": [{"text": {"content": r.get("element", "")}}]},
+                        "Suggestion": {"rich_text": [{"text": {"content": r.get("suggestion", "")}}]}
+                    }
+                )
+                break
+            except APIResponseError as e:
+                if e.code != APIErrorCode.RateLimited or attempt == NOTION_MAX_RETRIES:
+                    raise
+                await asyncio.sleep(float(e.headers.get("Retry-After", 1)))
+        await asyncio.sleep(max(0.0, 1.0 - (loop.time() - started)))
 
+async def _export_to_notion(results, notion_token, database_id):
+    sem = asyncio.Semaphore(NOTION_CONCURRENCY)
+    async with AsyncNotionClient(auth=notion_token) as notion:
+        outcomes = await asyncio.gather(*[_push_to_notion(r, notion, database_id, sem) for r in results],
+                                        return_exceptions=True)
+    errors = [o for o in outcomes if isinstance(o, Exception)]
+    if errors:
+        raise RuntimeError(f"{len(errors)} of {len(results)} results failed to export: {errors[0]}") from errors[0]
 
+def export_to_notion(results, notion_token, database_id):
+    asyncio.run(_export_to_notion(results, notion_token, database_id))
+    return True
@@ -1,36 +1,71 @@
 import subprocess
+import threading
+import time
+from collections import OrderedDict
 subprocess.run(["playwright", "install"])
-from audit import run_audit, export_to_notion, annotate_screenshot
+from audit import run_audit, export_to_notion, annotate_screenshot, SCREENSHOT_QUALITY
 import streamlit as st
+from io import BytesIO
 
 st.set_page_config(page_title="Web Usability Auditor", layout="wide")
 st.title("🌐 Web Usability & Accessibility Auditor")
 
+AUDIT_TTL = 3600
+AUDIT_CACHE_SIZE = 32
+
+# Shared across sessions, oldest first. A plain dict rather than
+# st.cache_data, which would record the streamed progress writes and replay
+# them on a hit.
+@st.cache_resource
+def audit_cache():
+    return OrderedDict(), threading.Lock()
+
+def cached_audit(url, on_text=None, refresh=False):
+    cache, lock = audit_cache()
+    now = time.time()
+    with lock:
+        hit = cache.get(url)
+    if hit and not refresh and now - hit[0] < AUDIT_TTL:
+        return hit[1], hit[2]
+    results, screenshot = run_audit(url, on_text=on_text, refresh=refresh)
+    with lock:
+        cache[url] = (now, results, screenshot)
+        cache.move_to_end(url)
+        while cache and (len(cache) > AUDIT_CACHE_SIZE or now - next(iter(cache.values()))[0] >= AUDIT_TTL):
+            cache.popitem(last=False)
+    return results, screenshot
+
 url = st.text_input("🔗 Website URL", "https://example.com")
+force_refresh = st.checkbox("🔄 Force refresh (ignore cached audits)")
 run_btn = st.button("🚀 Run Audit")
 
 if 'results' not in st.session_state:
     st.session_state['results'] = None
-if 'screenshot' not in st.session_state:
-    st.session_state['screenshot'] = None
+if 'annotated_bytes' not in st.session_state:
+    st.session_state['annotated_bytes'] = None
 
 if run_btn and url:
     with st.spinner("Auditing the site..."):
         try:
-            results, screenshot = run_audit(url)
+            progress = st.empty()
+            results, screenshot = cached_audit(url, on_text=lambda text: progress.code(text, language="json"),
+                                               refresh=force_refresh)
+            progress.empty()
+            # Annotate once per audit so widget reruns skip the PIL pipeline
+            buf = BytesIO()
+            annotate_screenshot(screenshot, results).save(buf, format="JPEG", quality=SCREENSHOT_QUALITY)
             st.session_state['results'] = results
-            st.session_state['screenshot'] = screenshot
+            st.session_state['annotated_bytes'] = buf.getvalue()
             st.success("✅ Audit complete!")
         except Exception as e:
             st.error(f"Error: {e}")
 
 results = st.session_state.get('results')
-screenshot = st.session_state.get('screenshot')
+annotated_bytes = st.session_state.get('annotated_bytes')
 
-if results and screenshot:
+if results and annotated_bytes:
     st.subheader("🖼️ Annotated Screenshot")
-    img = annotate_screenshot(screenshot, results)
-    st.image(img, caption="Red highlights = issues", use_column_width=True)
+    st.image(annotated_bytes, caption="Red highlights = issues", use_column_width=True)
 
     st.subheader("📋 Audit Results (JSON)")
     st.json(results)